@@ -3,6 +3,7 @@
 from __future__ import print_function
 
 import argparse
+import fcntl
 import multiprocessing
 import os, os.path
 import platform
@@ -307,18 +308,42 @@ def check_for_prerequisites(args):
 # BUILD API
 #================================================
 
-def run_cmd(name, cmd, ins=None, outs=None, use_shell=False):
+def clone_file(src, dst, *, follow_symlinks=True):
+    # Clone a file without copying its data: try a filesystem reflink
+    # (FICLONE, copy-on-write on btrfs/XFS), then a hardlink, and only fall
+    # back to a byte copy when neither is possible (e.g. cross-device).
+    # The trees cloned by the installer are read-only once in place, so
+    # sharing the data is safe and turns the copy into a metadata operation.
+    FICLONE = 0x40049409
+    try:
+        with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        shutil.copystat(src, dst, follow_symlinks=follow_symlinks)
+        return dst
+    except OSError:
+        if os.path.exists(dst): os.remove(dst)
+    try:
+        os.link(src, dst)
+        return dst
+    except OSError:
+        return shutil.copy2(src, dst, follow_symlinks=follow_symlinks)
+
+def run_cmd(name, cmd, ins=None, outs=None, use_shell=False, cwd=None):
+    # Run build steps in their directory via cwd= rather than os.chdir() --
+    # chdir changes the whole installer process and breaks any relative path
+    # used afterwards, while cwd= only affects the child
     try:
         rv = subprocess.check_call(cmd, stdin=ins, stdout=outs,
-                                   stderr=subprocess.STDOUT, shell=use_shell)
+                                   stderr=subprocess.STDOUT, shell=use_shell,
+                                   cwd=cwd)
     except subprocess.CalledProcessError as e:
         print('Could not {} ({})!'.format(name, e))
         sys.exit(e.returncode)
 
-def get_cmd_output(name, cmd, ins=None, use_shell=False):
+def get_cmd_output(name, cmd, ins=None, use_shell=False, cwd=None):
     try:
         out = subprocess.check_output(cmd, stdin=ins, stderr=subprocess.STDOUT,
-                                      shell=use_shell)
+                                      shell=use_shell, cwd=cwd)
     except subprocess.CalledProcessError as e:
         print('Could not {} ({})!'.format(name, e))
         sys.exit(e.returncode)
@@ -379,26 +404,22 @@ def install_clang_llvm(base_path, install_path, num_threads, llvm_targets):
     #=====================================================
     # BUILD AND INSTALL LLVM
     #=====================================================
-    cur_dir = os.getcwd()
-    os.chdir(llvm_download_path + '/llvm')
-    os.mkdir('build')
-    os.chdir('build')
+    llvm_build_path = os.path.join(llvm_download_path, 'llvm', 'build')
+    os.mkdir(llvm_build_path)
 
     print('Running CMake...')
     args = ['cmake'] + cmake_flags + ['..']
-    run_cmd('run CMake', args)
+    run_cmd('run CMake', args, cwd=llvm_build_path)
 
     print('Running Make...')
     if llvm_version > 3.7:
         args = ['make', '-j', str(num_threads), 'install-llvm-headers']
-        run_cmd('run Make headers', args)
+        run_cmd('run Make headers', args, cwd=llvm_build_path)
 
     args = ['make', '-j', str(num_threads)]
-    run_cmd('run Make', args)
+    run_cmd('run Make', args, cwd=llvm_build_path)
     args += ['install']
-    run_cmd('install clang/LLVM', args)
-
-    os.chdir(cur_dir)
+    run_cmd('install clang/LLVM', args, cwd=llvm_build_path)
 
 
 def install_binutils(base_path, install_path, num_threads, target):
@@ -458,38 +479,31 @@ def install_binutils(base_path, install_path, num_threads, target):
     #=====================================================
     # BUILD AND INSTALL BINUTILS
     #=====================================================
-    cur_dir = os.getcwd()
-
-    os.chdir(binutils_install_path)
-    shutil.rmtree(binutils_install_path
-                  + "/build.{}".format(target), ignore_errors=True)
-    os.mkdir('build.{}'.format(target))
-    os.chdir('build.{}'.format(target))
+    build_path = os.path.join(binutils_install_path,
+                              'build.{}'.format(target))
+    shutil.rmtree(build_path, ignore_errors=True)
+    os.mkdir(build_path)
 
     print("Configuring binutils...")
     args = ['../configure'] + configure_flags \
         + ["--target={}-popcorn-linux-gnu".format(target)];
-    run_cmd('configure binutils', args)
+    run_cmd('configure binutils', args, cwd=build_path)
 
     print('Making binutils...')
     args = ['make', '-j', str(num_threads)]
-    run_cmd('run Make', args)
+    run_cmd('run Make', args, cwd=build_path)
     args += ['install']
-    run_cmd('install binutils', args)
-
-    os.chdir(cur_dir)
+    run_cmd('install binutils', args, cwd=build_path)
 
 def install_musl(base_path, install_path, target, num_threads):
-    cur_dir = os.getcwd()
-
     #=====================================================
     # CONFIGURE & INSTALL MUSL
     #=====================================================
     target_install_path = os.path.join(install_path, target)
-    os.chdir(os.path.join(base_path, 'lib', 'musl-1.1.18'))
+    musl_path = os.path.join(base_path, 'lib', 'musl-1.1.18')
 
-    if os.path.isfile('Makefile'):
-        run_cmd('clean musl', ['make', 'distclean'])
+    if os.path.isfile(os.path.join(musl_path, 'Makefile')):
+        run_cmd('clean musl', ['make', 'distclean'], cwd=musl_path)
 
     if kernel_version == 4.4:
         kernel_arg = "POPCORN_4_4"
@@ -510,19 +524,16 @@ def install_musl(base_path, install_path, target, num_threads):
                      .format(target),
                      'KERVER="{}"'.format(kernel_arg)])
     print(args)
-    run_cmd('configure musl-libc ({})'.format(target), args, use_shell=True)
+    run_cmd('configure musl-libc ({})'.format(target), args, use_shell=True,
+            cwd=musl_path)
 
     print('Making musl ({})...'.format(target))
     args = ['make', '-j', str(num_threads)]
-    run_cmd('make musl-libc ({})'.format(target), args)
+    run_cmd('make musl-libc ({})'.format(target), args, cwd=musl_path)
     args += ['install']
-    run_cmd('install musl-libc ({})'.format(target), args)
-
-    os.chdir(cur_dir)
+    run_cmd('install musl-libc ({})'.format(target), args, cwd=musl_path)
 
 def install_gcc_glibc(base_path, install_path, install_targets, num_threads):
-    cur_dir = os.getcwd()
-
     gcc_download_path = os.path.join(install_path, 'src', 'gcc')
     glibc_download_path = os.path.join(install_path, 'src', 'glibc')
     linux_download_path = os.path.join(install_path, 'src', 'popcorn-kernel')
@@ -538,10 +549,8 @@ def install_gcc_glibc(base_path, install_path, install_targets, num_threads):
     run_cmd('download GCC source', args)
 
     # Download GCC prerequisites
-    os.chdir(gcc_download_path)
     args = [ 'contrib/download_prerequisites' ]
-    run_cmd('Download GCC prerequisites', args)
-    os.chdir(cur_dir)
+    run_cmd('Download GCC prerequisites', args, cwd=gcc_download_path)
 
     args = ['git', 'clone', '--depth', '1', '-b', "glibc-" + glibc_version,
              glibc_url, glibc_download_path]
@@ -568,19 +577,17 @@ def install_gcc_glibc(base_path, install_path, install_targets, num_threads):
         args = ['rm', '-rf', sysroot]
         run_cmd('cleanup sysroot for ' + target, args)
         os.makedirs(sysroot, exist_ok=True)
-        os.chdir(linux_download_path)
         args = ['make', 'ARCH={}'.format(linux_targets[target]),
                 'INSTALL_HDR_PATH="{}"'.format(sysroot), 'headers_install']
-        run_cmd('Install Linux headers', args)
-        shutil.copytree(sysroot, sysroot_usr)
+        run_cmd('Install Linux headers', args, cwd=linux_download_path)
+        shutil.copytree(sysroot, sysroot_usr, copy_function=clone_file)
 
         # GCC Stage 1
-        gcc_stage_1_dir = "build-gcc-stage-1." + target
-        os.chdir(gcc_download_path)
+        gcc_stage_1_dir = os.path.join(gcc_download_path,
+                                       "build-gcc-stage-1." + target)
         args = ['rm', '-rf', gcc_stage_1_dir]
         run_cmd('clean ' + gcc_stage_1_dir, args)
         os.mkdir(gcc_stage_1_dir)
-        os.chdir(gcc_stage_1_dir)
 
         args = [gcc_download_path + '/configure',
                 '--prefix={}'.format(install_path),
@@ -602,24 +609,24 @@ def install_gcc_glibc(base_path, install_path, install_targets, num_threads):
                 '--disable-multilib',
                 '--with-libdir={}/lib'.format(sysroot),
                 "CFLAGS_FOR_TARGET='-ffunction-sections -fdata-sections'"]
-        run_cmd('Configure GCC Stage 1 for ' + target, args)
+        run_cmd('Configure GCC Stage 1 for ' + target, args,
+                cwd=gcc_stage_1_dir)
 
         args = ['make', '-j{}'.format(num_threads), 'inhibit-libc=true',
                 'all-gcc']
-        run_cmd('Build GCC Stage 1 for ' + target, args)
+        run_cmd('Build GCC Stage 1 for ' + target, args, cwd=gcc_stage_1_dir)
 
         args = ['make', '-j{}'.format(num_threads), 'inhibit-libc=true',
                 'install-gcc']
-        run_cmd('Install GCC Stage 1 for ' + target, args)
+        run_cmd('Install GCC Stage 1 for ' + target, args,
+                cwd=gcc_stage_1_dir)
 
         # glibc Stage 1
         glibc_stage_1_dir = os.path.join(glibc_download_path,
                                          "build-glibc-stage-1." + target)
-        os.chdir(glibc_download_path)
         args = ['rm', '-rf', glibc_stage_1_dir]
         run_cmd('clean ' + glibc_stage_1_dir, args)
         os.mkdir(glibc_stage_1_dir)
-        os.chdir(glibc_stage_1_dir)
 
         args = [glibc_download_path + '/configure',
                 '--prefix=/usr',
@@ -636,11 +643,13 @@ def install_gcc_glibc(base_path, install_path, install_targets, num_threads):
                 '--without-cvs',
                 '--disable-profile',
                 '--without-gd']
-        run_cmd('Configure glibc Stage 1 for ' + target, args)
+        run_cmd('Configure glibc Stage 1 for ' + target, args,
+                cwd=glibc_stage_1_dir)
 
         args = ['make', 'install-bootstrap-headers=yes', 'install-headers',
                 'install_root={}'.format(sysroot)]
-        run_cmd('Build glibc Stage 1 for ' + target, args)
+        run_cmd('Build glibc Stage 1 for ' + target, args,
+                cwd=glibc_stage_1_dir)
 
         stubs_h = os.path.join(sysroot, 'usr', 'include', 'gnu', 'stubs.h')
         pathlib.Path(stubs_h).touch()
@@ -654,7 +663,8 @@ def install_gcc_glibc(base_path, install_path, install_targets, num_threads):
         shutil.copyfile(src, dst)
 
         args = ['make', 'csu/subdir_lib']
-        run_cmd('make csu/subdir_lib for ' + target, args)
+        run_cmd('make csu/subdir_lib for ' + target, args,
+                cwd=glibc_stage_1_dir)
 
         sysroot_lib = os.path.join(sysroot, 'lib')
         shutil.rmtree(sysroot_lib, ignore_errors=True)
@@ -672,12 +682,11 @@ def install_gcc_glibc(base_path, install_path, install_targets, num_threads):
         run_cmd('Build dummy libc.so for ' + target, args)
 
         # GCC Stage 2
-        gcc_stage_2_dir = "build-gcc-stage-2." + target
-        os.chdir(gcc_download_path)
+        gcc_stage_2_dir = os.path.join(gcc_download_path,
+                                       "build-gcc-stage-2." + target)
         args = ['rm', '-rf', gcc_stage_2_dir]
         run_cmd('clean ' + gcc_stage_2_dir, args)
         os.mkdir(gcc_stage_2_dir)
-        os.chdir(gcc_stage_2_dir)
 
         args = [gcc_download_path + '/configure',
                 '--prefix={}'.format(install_path),
@@ -701,50 +710,58 @@ def install_gcc_glibc(base_path, install_path, install_targets, num_threads):
                 '--disable-bootstrap',
                 '--with-libdir={}/lib'.format(sysroot),
                 'CFLAGS_FOR_TARGET={}'.format("-ffunction-sections -fdata-sections")]
-        run_cmd('Configure GCC Stage 2 for ' + target, args)
+        run_cmd('Configure GCC Stage 2 for ' + target, args,
+                cwd=gcc_stage_2_dir)
 
         args = ['make', '-j{}'.format(num_threads), 'configure-gcc',
                 'configure-libcpp', 'configure-build-libiberty']
-        run_cmd('Build GCC Stage 2 for ' + target, args)
+        run_cmd('Build GCC Stage 2 for ' + target, args,
+                cwd=gcc_stage_2_dir)
 
         args = ['make', '-j{}'.format(num_threads),
                 'all-libcpp', 'all-build-libiberty']
-        run_cmd('Build GCC Stage 2 for ' + target, args)
+        run_cmd('Build GCC Stage 2 for ' + target, args,
+                cwd=gcc_stage_2_dir)
 
         args = ['make', '-j{}'.format(num_threads), 'configure-libdecnumber']
-        run_cmd('Build GCC Stage 2 for ' + target, args)
+        run_cmd('Build GCC Stage 2 for ' + target, args,
+                cwd=gcc_stage_2_dir)
 
         args = ['make', '-j{}'.format(num_threads),
                 '-C', 'libdecnumber', 'libdecnumber.a']
-        run_cmd('Build GCC Stage 2 for ' + target, args)
+        run_cmd('Build GCC Stage 2 for ' + target, args,
+                cwd=gcc_stage_2_dir)
 
         args = ['make', '-j{}'.format(num_threads), 'configure-libbacktrace']
-        run_cmd('Build GCC Stage 2 for ' + target, args)
+        run_cmd('Build GCC Stage 2 for ' + target, args,
+                cwd=gcc_stage_2_dir)
 
         args = ['make', '-j{}'.format(num_threads),
                 '-C', 'libbacktrace']
-        run_cmd('Build GCC Stage 2 for ' + target, args)
+        run_cmd('Build GCC Stage 2 for ' + target, args,
+                cwd=gcc_stage_2_dir)
 
         args = ['make', '-j{}'.format(num_threads),
                 '-C', 'gcc', 'libgcc.mvars']
-        run_cmd('Build GCC Stage 2 for ' + target, args)
+        run_cmd('Build GCC Stage 2 for ' + target, args,
+                cwd=gcc_stage_2_dir)
 
         args = ['make', '-j{}'.format(num_threads),
                 'all-gcc', 'all-target-libgcc']
-        run_cmd('Build GCC Stage 2 for ' + target, args)
+        run_cmd('Build GCC Stage 2 for ' + target, args,
+                cwd=gcc_stage_2_dir)
 
         args = ['make', '-j{}'.format(num_threads),
                 'install-gcc', 'install-target-libgcc']
-        run_cmd('Build GCC Stage 2 for ' + target, args)
+        run_cmd('Build GCC Stage 2 for ' + target, args,
+                cwd=gcc_stage_2_dir)
 
         # glibc Stage 2 (final)
         glibc_stage_2_dir = os.path.join(glibc_download_path,
                                          "build-glibc-stage-2." + target)
-        os.chdir(glibc_download_path)
         args = ['rm', '-rf', glibc_stage_2_dir]
         run_cmd('clean ' + glibc_stage_2_dir, args)
         os.mkdir(glibc_stage_2_dir)
-        os.chdir(glibc_stage_2_dir)
 
         for i in ['libc.so', 'crt1.o', 'crti.o', 'crtn.o']:
             f = os.path.join(sysroot, 'lib', i)
@@ -771,22 +788,24 @@ def install_gcc_glibc(base_path, install_path, install_targets, num_threads):
                 '--without-gd',
                 'libc_cv_slibdir=/lib',
                 'libc_cv_rtlddir=/lib']
-        run_cmd('Configure glibc Stage 2 for ' + target, args)
+        run_cmd('Configure glibc Stage 2 for ' + target, args,
+                cwd=glibc_stage_2_dir)
 
         args = ['make', '-j{}'.format(num_threads)]
-        run_cmd('Build glibc Stage 2 for ' + target, args)
+        run_cmd('Build glibc Stage 2 for ' + target, args,
+                cwd=glibc_stage_2_dir)
 
         args = ['make', '-j{}'.format(num_threads), 'install',
                 'install_root={}'.format(sysroot)]
-        run_cmd('Build glibc Stage 2 for ' + target, args)
+        run_cmd('Build glibc Stage 2 for ' + target, args,
+                cwd=glibc_stage_2_dir)
 
         # GCC Stage 3 (final)
-        gcc_stage_3_dir = "build-gcc-stage-3." + target
-        os.chdir(gcc_download_path)
+        gcc_stage_3_dir = os.path.join(gcc_download_path,
+                                       "build-gcc-stage-3." + target)
         args = ['rm', '-rf', gcc_stage_3_dir]
         run_cmd('clean ' + gcc_stage_3_dir, args)
         os.mkdir(gcc_stage_3_dir)
-        os.chdir(gcc_stage_3_dir)
 
         args = [gcc_download_path + '/configure',
                 '--target={}-popcorn-linux-gnu'.format(target),
@@ -819,27 +838,24 @@ def install_gcc_glibc(base_path, install_path, install_targets, num_threads):
 
         args.append('CFLAGS_FOR_TARGET={}'.format("-ffunction-sections -fdata-sections"))
 
-        run_cmd('Configure GCC Stage 3 for ' + target, args)
+        run_cmd('Configure GCC Stage 3 for ' + target, args,
+                cwd=gcc_stage_3_dir)
 
         args = ['make', '-j{}'.format(num_threads), 'all']
-        run_cmd('Build GCC Stage 3 for ' + target, args)
+        run_cmd('Build GCC Stage 3 for ' + target, args, cwd=gcc_stage_3_dir)
 
         args = ['make', '-j{}'.format(num_threads), 'install']
-        run_cmd('Build GCC Stage 3 for ' + target, args)
-
-        os.chdir(cur_dir)
+        run_cmd('Build GCC Stage 3 for ' + target, args, cwd=gcc_stage_3_dir)
 
 def install_libelf(base_path, install_path, target, num_threads):
-    cur_dir = os.getcwd()
-
     #=====================================================
     # CONFIGURE & INSTALL LIBELF
     #=====================================================
     target_install_path = os.path.join(install_path, target)
-    os.chdir(os.path.join(base_path, 'lib', 'libelf'))
+    libelf_path = os.path.join(base_path, 'lib', 'libelf')
 
-    if os.path.isfile('Makefile'):
-        run_cmd('clean libelf', ['make', 'distclean'])
+    if os.path.isfile(os.path.join(libelf_path, 'Makefile')):
+        run_cmd('clean libelf', ['make', 'distclean'], cwd=libelf_path)
 
     print("Configuring libelf ({})...".format(target))
     compiler = os.path.join(target_install_path, 'bin', 'musl-clang')
@@ -855,28 +871,26 @@ def install_libelf(base_path, install_path, target, num_threads):
                      '--disable-shared',
                      '--disable-nls',
                      '--enable-extended-format'])
-    run_cmd('configure libelf ({})'.format(target), args, use_shell=True)
+    run_cmd('configure libelf ({})'.format(target), args, use_shell=True,
+            cwd=libelf_path)
 
     print('Making libelf ({})...'.format(target))
     args = ['make', '-j', str(num_threads)]
-    run_cmd('make libelf ({})'.format(target), args)
+    run_cmd('make libelf ({})'.format(target), args, cwd=libelf_path)
     args += ['install']
-    run_cmd('install libelf ({})'.format(target), args)
-
-    os.chdir(cur_dir)
+    run_cmd('install libelf ({})'.format(target), args, cwd=libelf_path)
 
 def install_libopenpop(base_path, install_path, target, first_target, num_threads):
     global host
 
-    cur_dir = os.getcwd()
-
     #=====================================================
     # CONFIGURE & INSTALL LIBOPENPOP
     #=====================================================
     target_install_path = os.path.join(install_path, target)
-    os.chdir(os.path.join(base_path, 'lib', 'libopenpop'))
-    if os.path.isfile('Makefile'):
-        run_cmd('clean libopenpop', ['make', 'distclean'])
+    libopenpop_path = os.path.join(base_path, 'lib', 'libopenpop')
+    if os.path.isfile(os.path.join(libopenpop_path, 'Makefile')):
+        run_cmd('clean libopenpop', ['make', 'distclean'],
+                cwd=libopenpop_path)
 
     print("Configuring libopenpop ({})...".format(target))
 
@@ -907,43 +921,37 @@ def install_libopenpop(base_path, install_path, target, first_target, num_thread
                      '--host={}-linux-gnu'.format(target),
                      '--enable-static',
                      '--disable-shared'])
-    run_cmd('configure libopenpop ({})'.format(target), args, use_shell=True)
+    run_cmd('configure libopenpop ({})'.format(target), args, use_shell=True,
+            cwd=libopenpop_path)
 
     print('Making libopenpop ({})...'.format(target))
     args = ['make', '-j', str(num_threads)]
-    run_cmd('make libopenpop ({})'.format(target), args)
+    run_cmd('make libopenpop ({})'.format(target), args, cwd=libopenpop_path)
     args += ['install']
-    run_cmd('install libopenpop ({})'.format(target), args)
-
-    os.chdir(cur_dir)
+    run_cmd('install libopenpop ({})'.format(target), args,
+            cwd=libopenpop_path)
 
 def install_stack_transformation(base_path, install_path, num_threads, st_debug):
-    cur_dir = os.getcwd()
-
     #=====================================================
     # CONFIGURE & INSTALL STACK TRANSFORMATION LIBRARY
     #=====================================================
-    os.chdir(os.path.join(base_path, 'lib', 'stack_transformation'))
-    run_cmd('clean libstack-transform', ['make', 'clean'])
+    st_path = os.path.join(base_path, 'lib', 'stack_transformation')
+    run_cmd('clean libstack-transform', ['make', 'clean'], cwd=st_path)
 
     print('Making stack_transformation...')
     args = ['make', '-j', str(num_threads), 'POPCORN={}'.format(install_path)]
     if st_debug: args += ['type=debug']
-    run_cmd('make libstack-transform', args)
+    run_cmd('make libstack-transform', args, cwd=st_path)
     args += ['install']
-    run_cmd('install libstack-transform', args)
-
-    os.chdir(cur_dir)
+    run_cmd('install libstack-transform', args, cwd=st_path)
 
 def install_migration(base_path, install_path, num_threads, libmigration_type,
                       enable_libmigration_timing):
-    cur_dir = os.getcwd()
-
     #=====================================================
     # CONFIGURE & INSTALL MIGRATION LIBRARY
     #=====================================================
-    os.chdir(os.path.join(base_path, 'lib', 'migration'))
-    run_cmd('clean libmigration', ['make', 'clean'])
+    migration_path = os.path.join(base_path, 'lib', 'migration')
+    run_cmd('clean libmigration', ['make', 'clean'], cwd=migration_path)
 
     print('Making libmigration...')
     args = ['make',
@@ -959,58 +967,47 @@ def install_migration(base_path, install_path, num_threads, libmigration_type,
         elif enable_libmigration_timing:
             flags += 'timing'
         args += [flags]
-    run_cmd('make libmigration', args)
+    run_cmd('make libmigration', args, cwd=migration_path)
     args += ['install']
-    run_cmd('install libmigration', args)
-
-    os.chdir(cur_dir)
+    run_cmd('install libmigration', args, cwd=migration_path)
 
 def install_stackdepth(base_path, install_path, num_threads):
-    cur_dir = os.getcwd()
-
     #=====================================================
     # INSTALL STACK DEPTH LIBRARY
     #=====================================================
-    os.chdir(os.path.join(base_path, 'lib', 'stack_depth'))
-    run_cmd('clean libstack-depth', ['make', 'clean'])
+    stackdepth_path = os.path.join(base_path, 'lib', 'stack_depth')
+    run_cmd('clean libstack-depth', ['make', 'clean'], cwd=stackdepth_path)
 
     print('Making stack depth library...')
     args = ['make', '-j', str(num_threads), 'POPCORN={}'.format(install_path)]
-    run_cmd('make libstack-depth', args)
+    run_cmd('make libstack-depth', args, cwd=stackdepth_path)
     args += ['install']
-    run_cmd('install libstack-depth', args)
-
-    os.chdir(cur_dir)
+    run_cmd('install libstack-depth', args, cwd=stackdepth_path)
 
 def install_tools(base_path, install_path, num_threads):
-    cur_dir = os.getcwd()
-
     #=====================================================
     # INSTALL ALIGNMENT TOOL
     #=====================================================
-    os.chdir(os.path.join(base_path, 'tool', 'alignment'))
-    run_cmd('clean pyalign', ['make', 'clean'])
+    alignment_path = os.path.join(base_path, 'tool', 'alignment')
+    run_cmd('clean pyalign', ['make', 'clean'], cwd=alignment_path)
 
     print('Making pyalign...')
     args = ['make', '-j', str(num_threads), 'install',
             'POPCORN={}'.format(install_path)]
-    run_cmd('make/install pyalign', args)
-
-    os.chdir(cur_dir)
+    run_cmd('make/install pyalign', args, cwd=alignment_path)
 
     #=====================================================
     # INSTALL STACK METADATA TOOL
     #=====================================================
-    os.chdir(os.path.join(base_path, 'tool', 'stack_metadata'))
-    run_cmd('clean stack metadata tool', ['make', 'clean'])
+    stack_metadata_path = os.path.join(base_path, 'tool', 'stack_metadata')
+    run_cmd('clean stack metadata tool', ['make', 'clean'],
+            cwd=stack_metadata_path)
 
     print('Making stack metadata tool...')
     args = ['make', '-j', str(num_threads), 'POPCORN={}'.format(install_path)]
-    run_cmd('make stack metadata tools', args)
+    run_cmd('make stack metadata tools', args, cwd=stack_metadata_path)
     args += ['install']
-    run_cmd('install stack metadata tools', args)
-
-    os.chdir(cur_dir)
+    run_cmd('install stack metadata tools', args, cwd=stack_metadata_path)
 
 def install_utils(base_path, install_path, num_threads):
     #=====================================================
@@ -1034,17 +1031,12 @@ def install_utils(base_path, install_path, num_threads):
             shutil.copy(s, d)
 
 def build_namespace(base_path):
-    cur_dir = os.getcwd()
-
     #=====================================================
     # MAKE NAMESPACE
     #=====================================================
-    os.chdir(os.path.join(base_path, 'tool', 'namespace'))
-
     print("Building namespace tools...")
-    run_cmd('make namespace tools', ['make'])
-
-    os.chdir(cur_dir)
+    run_cmd('make namespace tools', ['make'],
+            cwd=os.path.join(base_path, 'tool', 'namespace'))
 
 def main(args):
 
@@ -19,12 +19,18 @@
 
 import os
 import sys
+import functools
+from collections import defaultdict
+import numpy as np
+import pandas as pd
 from graph import Graph
 from graph import InterferenceGraph
 
 def getPage(addr):
-    ''' Get the page for an address '''
-    return addr & 0xfffffffffffff000
+    ''' Get the page number for an address.  Page numbers uniquely identify a
+        page just like the masked address, but also stay valid dict/set keys.
+    '''
+    return addr >> 12
 
 class ParseConfig:
     ''' Configuration for parsing a PAT file. Can be configuration to only
@@ -46,6 +52,132 @@ class ParseConfig:
         if regions: self.regions = set(regions.split(','))
         else: self.regions = None
 
+        # Flatten the symbol table into arrays sorted by starting address so
+        # whole address columns can be resolved with one vectorized binary
+        # search.  Several symbols may share a starting address, so keep the
+        # per-address symbol lists & the largest ending address for each.
+        if symbolTable:
+            starts = symbolTable.sortedaddrs
+            self.symStarts = np.array(starts, dtype=np.uint64)
+            self.symEnds = np.zeros(len(starts), dtype=np.uint64)
+            self.symLists = np.empty(len(starts), dtype=object)
+            for i, addr in enumerate(starts):
+                syms = symbolTable.addrs[addr]
+                self.symLists[i] = syms
+                self.symEnds[i] = addr + max([ s.size for s in syms ])
+
+''' Column names for entries in a PAT file. '''
+_PATColumns = [ "time", "nid", "tid", "perm", "ip", "addr", "region" ]
+
+''' Integer codes for the perm column.  The codes double as indexes into the
+    [R, W, I] count lists maintained by the analyses.
+'''
+PermR = 0
+PermW = 1
+PermI = 2
+
+def _load_pat_df(pat, config, verbose):
+    ''' Load a PAT file into a columnar DataFrame & apply the configuration's
+        filters.  pandas' C tokenizer parses the whole file in one pass,
+        replacing the per-line split/convert/filter work done in parsePAT()
+        with vectorized column operations.
+
+        Arguments:
+            pat (str): page access trace file
+            config (ParseConfig): configuration for filtering PAT entries
+            verbose (bool): print verbose output
+
+        Return:
+            df (DataFrame): filtered PAT entries with columns time (float),
+                            nid/tid (int), perm (int8 PermR/PermW/PermI
+                            code), ip (str, hex),
+                            addr (uint64), region (int), page (uint64 page
+                            number) and invalidates (per-entry fault weight:
+                            1 for R/W, number of invalidate messages for I).
+                            For "I" entries
+                            the region column contains the bitmask of nodes to
+                            which invalidation messages were sent.  If the
+                            configuration has a symbol table, an additional
+                            symbol column maps each entry to its Symbol object
+                            (or None).
+    '''
+    if verbose: print("-> Parsing file '{}' <-".format(pat))
+
+    df = pd.read_csv(pat, sep=r'\s+', header=None, names=_PATColumns,
+                     engine="c",
+                     dtype={ "time" : np.float64, "nid" : np.int64,
+                             "tid" : np.int64, "perm" : str, "ip" : str,
+                             "addr" : str, "region" : np.int64 })
+
+    # Filter based on a time window
+    df = df[(df.time.values >= config.start) & (df.time.values <= config.end)]
+
+    # Filter based on node
+    if config.nodes:
+        df = df[df.nid.isin([ int(n) for n in config.nodes ])]
+
+    # Filter based on region
+    if config.regions:
+        df = df[df.region.isin([ int(r) for r in config.regions ])]
+
+    # Convert addresses from hex in a single pass
+    df = df.reset_index(drop=True)
+    addrs = np.array([ int(a, base=16) for a in df.addr.values ],
+                     dtype=np.uint64)
+    df["addr"] = addrs
+
+    # Filter based on page being accessed
+    if config.pages:
+        df = df[df.addr.isin(config.pages)].reset_index(drop=True)
+
+    # Precompute page numbers for all entries with a single vectorized shift
+    df["page"] = df.addr.values >> np.uint64(12)
+
+    # Encode permissions as a single byte so consumers compare integers
+    # instead of strings on the per-fault paths
+    df["perm"] = df.perm.map({ "R" : PermR, "W" : PermW, "I" : PermI }) \
+                        .astype(np.int8)
+
+    # Precompute per-entry fault weights: R/W entries count once, "I" entries
+    # count once per invalidate message.  np.bitwise_count popcounts the whole
+    # bitmask column with a hardware ufunc (NumPy >= 2.0).
+    bitmasks = df.region.values.astype(np.uint64)
+    if hasattr(np, "bitwise_count"): counts = np.bitwise_count(bitmasks)
+    else: counts = np.unpackbits(bitmasks.view(np.uint8).reshape(-1, 8),
+                                 axis=1).sum(axis=1)
+    df["invalidates"] = np.where(df.perm.values == PermI, counts, 1)
+
+    # Resolve symbols for the unique addresses only -- traces have many
+    # orders of magnitude more faults than distinct addresses.  A single
+    # vectorized binary search over the flattened symbol table finds the
+    # candidate symbol ranges for every unique address at once.
+    if config.symbolTable:
+        uniqAddrs, inverse = np.unique(df.addr.values, return_inverse=True)
+        idx = np.searchsorted(config.symStarts, uniqAddrs, side="right") - 1
+        valid = (idx >= 0) & (uniqAddrs < config.symEnds[idx.clip(min=0)])
+        uniqSyms = np.empty(len(uniqAddrs), dtype=object)
+        for i in np.flatnonzero(valid):
+            for sym in config.symLists[idx[i]]:
+                if sym.contains(uniqAddrs[i]):
+                    uniqSyms[i] = sym
+                    break
+        symbols = uniqSyms[inverse]
+
+        # Filter based on type of memory object accessed
+        if config.noCode or config.noData:
+            keep = np.ones(len(df), dtype=bool)
+            for i, sym in enumerate(symbols):
+                if sym:
+                    if sym.isCode() and config.noCode: keep[i] = False
+                    elif sym.isData() and config.noData: keep[i] = False
+            df = df[keep].reset_index(drop=True)
+            symbols = symbols[keep]
+        df["symbol"] = symbols
+
+    if verbose: print("Parsed {} faults".format(len(df)))
+
+    return df
+
 def parsePAT(pat, config, callback, callbackData, verbose):
     ''' Generic parser.  For each line in the PAT file, determine if it fits
         the configuration.  If so, pass the parsed data to the callback.
@@ -62,33 +194,52 @@ def parsePAT(pat, config, callback, callbackData, verbose):
     '''
     if verbose: print("-> Parsing file '{}' <-".format(pat))
 
-    with open(pat, 'r') as patfp:
+    # Bind configuration attributes to locals outside the loop -- each
+    # config.* access below would otherwise be a dict probe per line
+    start = config.start
+    end = config.end
+    # The file is scanned as bytes; encode the filter sets to match
+    if config.nodes: nodes = set([ n.encode() for n in config.nodes ])
+    else: nodes = None
+    if config.regions: regions = set([ r.encode() for r in config.regions ])
+    else: regions = None
+    pages = config.pages
+    getSym = config.symbolTable.getSymbol if config.symbolTable else None
+    noCode = config.noCode
+    noData = config.noData
+
+    # Read in binary mode with a 1MB buffer -- the default 8KB buffer means
+    # two orders of magnitude more read syscalls on multi-GB traces -- and
+    # hint the kernel that the scan is sequential
+    with open(pat, 'rb', buffering=1<<20) as patfp:
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(patfp.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
         lineNum = 0
         for line in patfp:
             fields = line.split()
 
             # Filter based on a time window
             timestamp = float(fields[0])
-            if timestamp < config.start: continue
-            elif timestamp > config.end: break # No need to keep parsing
+            if timestamp < start: continue
+            elif timestamp > end: break # No need to keep parsing
 
             # Filter based on node
-            if config.nodes and fields[1] not in config.nodes: continue
+            if nodes and fields[1] not in nodes: continue
 
             # Filter based on region
-            if config.regions and fields[6] not in config.regions: continue
+            if regions and fields[6] not in regions: continue
 
             addr = int(fields[5], base=16)
 
             # Filter based on page being accessed
-            if config.pages and addr not in config.pages: continue
+            if pages and addr not in pages: continue
 
             # Filter based on type of memory object accessed
-            if config.symbolTable:
-                symbol = config.symbolTable.getSymbol(addr)
+            if getSym:
+                symbol = getSym(addr)
                 if symbol:
-                    if symbol.isCode() and config.noCode: continue
-                    elif symbol.isData() and config.noData: continue
+                    if symbol.isCode() and noCode: continue
+                    elif symbol.isData() and noData: continue
             else: symbol = None
 
             if verbose:
@@ -115,20 +266,18 @@ def parsePATtoGraphs(pat, graphType, config, verbose):
             graphs (dict: int -> Graph): dictionary containing per-region
                                          thread/page access graph
     '''
-    def graphCallback(fields, timestamp, addr, symbol, graphData):
-        graphs = graphData[0]
-        region = int(fields[6])
-        tid = int(fields[2])
-        if region not in graphs:
-            if graphData[1] == "interference":
-                graphs[region] = InterferenceGraph(graphData[2], True)
-            else: graphs[region] = Graph(graphData[2], True)
-        # TODO weight read/write accesses differently?
-        graphs[region].addMapping(tid, getPage(addr))
+    df = _load_pat_df(pat, config, verbose)
 
     graphs = {}
-    callbackData = (graphs, graphType, pat)
-    parsePAT(pat, config, graphCallback, callbackData, verbose)
+    for tid, page, region in zip(df.tid.values.tolist(),
+                                 df.page.values.tolist(),
+                                 df.region.values.tolist()):
+        if region not in graphs:
+            if graphType == "interference":
+                graphs[region] = InterferenceGraph(pat, True)
+            else: graphs[region] = Graph(pat, True)
+        # TODO weight read/write accesses differently?
+        graphs[region].addMapping(tid, page)
 
     if verbose: regions = ""
     for region in graphs:
@@ -165,27 +314,14 @@ def parsePATtoTrendline(pat, config, numChunks, perthread, verbose):
     def getTimeRange(pat):
         with open(pat, 'rb') as fp:
             start = float(fp.readline().split(maxsplit=1)[0])
-            fp.seek(-2, os.SEEK_END)
-            while fp.read(1) != b"\n": fp.seek(-2, os.SEEK_CUR)
-            end = float(fp.readline().split(maxsplit=1)[0])
-            return start, end
-
-    def trendlineCallback(fields, timestamp, addr, symbol, chunkData):
-        ''' Add entry to chunk bucket based on the timestamp & PID. '''
-        chunks = chunkData[0]
-        ranges = chunkData[1]
-        curChunk = chunkData[2]
-
-        # Move to the next chunk if the timestamp is past the upper bound of
-        # the current chunk.
-        while timestamp > ranges[curChunk]: curChunk += 1
-        chunkData[2] = curChunk # Need to maintain across callbacks!
 
-        if perthread:
-            tid = int(fields[2])
-            if tid not in chunks: chunks[tid] = [ 0 for i in range(numChunks) ]
-            chunks[tid][curChunk] += 1
-        else: chunks[curChunk] += 1
+            # Grab the last line from a single fixed-size read of the file's
+            # tail rather than seeking backwards one byte at a time
+            size = fp.seek(0, os.SEEK_END)
+            fp.seek(max(0, size - 4096))
+            lastline = fp.read().rstrip(b"\n").rsplit(b"\n", 1)[-1]
+            end = float(lastline.split(maxsplit=1)[0])
+            return start, end
 
     start, end = getTimeRange(pat)
     chunkSize = (end - start) / float(numChunks)
@@ -193,13 +329,21 @@ def parsePATtoTrendline(pat, config, numChunks, perthread, verbose):
     if verbose: print("-> Dividing application into {} {}s-sized chunks <-" \
                       .format(numChunks, chunkSize))
 
-    if perthread: chunks = {}
-    else: chunks = [ 0 for i in range(numChunks) ]
     ranges = [ (i + 1) * chunkSize + start for i in range(numChunks) ]
     ranges[-1] = ranges[-1] * 1.0001 # Avoid boundary corner cases caused by FP
                                      # representation for last entry
-    callbackData = [ chunks, ranges, 0 ]
-    parsePAT(pat, config, trendlineCallback, callbackData, verbose)
+
+    # Bucket every timestamp with one vectorized binary search & histogram
+    # the buckets, instead of advancing a chunk cursor line-by-line
+    df = _load_pat_df(pat, config, verbose)
+    idx = np.searchsorted(np.asarray(ranges), df.time.values, side="left")
+    idx = idx.clip(max=numChunks - 1)
+    if perthread:
+        chunks = {}
+        for tid, grp in pd.Series(idx).groupby(df.tid.values):
+            chunks[int(tid)] = np.bincount(grp.values,
+                                           minlength=numChunks).tolist()
+    else: chunks = np.bincount(idx, minlength=numChunks).tolist()
 
     # Prune chunks outside of the time window.  Include chunk if at least part
     # of it is contained inside the window.
@@ -223,13 +367,6 @@ def parsePATtoTrendline(pat, config, numChunks, perthread, verbose):
         return retChunks, ranges[startChunk:endChunk]
     else: return chunks[startChunk:endChunk], ranges[startChunk:endChunk]
 
-def getNumInvalidateMessages(bitmask):
-    num = 0
-    while bitmask > 0:
-        num += bitmask & 1
-        bitmask >>= 1
-    return num
-
 def parsePATforProblemSymbols(pat, config, verbose):
     ''' Parse PAT for symbols which cause the most faults.  Return a list of
         symbols sorted by the highest number of faults.
@@ -245,28 +382,32 @@ def parsePATforProblemSymbols(pat, config, verbose):
                                                 descending order
     '''
 
-    def problemSymbolCallback(fields, timestamp, addr, symbol, objAccessed):
-        if fields[3] == "R":
-            idx = 0
-            amount = 1
-        elif fields[3] == "W":
-            idx = 1
-            amount = 1
-        else:
-            idx = 2
-            amount = getNumInvalidateMessages(int(fields[6]))
-
-        if symbol:
-            if symbol.name not in objAccessed:
-                objAccessed[symbol.name] = [0, 0, 0]
-            objAccessed[symbol.name][idx] += amount
-        else:
-            # TODO this is only an approximation!
-            if addr > 0x7f0000000000: objAccessed["stack/mmap"][idx] += amount
-            else: objAccessed["heap"][idx] += amount
+    df = _load_pat_df(pat, config, verbose)
+
+    # Map each entry to the name of the object accessed; resolve per unique
+    # address rather than per fault.
+    # TODO the stack/mmap vs. heap split is only an approximation!
+    addrs = df.addr.values
+    uniqAddrs, inverse = np.unique(addrs, return_inverse=True)
+    uniqNames = np.empty(len(uniqAddrs), dtype=object)
+    if "symbol" in df.columns:
+        uniqSyms = { int(a) : s for a, s in zip(addrs, df.symbol.values) }
+    else: uniqSyms = {}
+    for i, addr in enumerate(uniqAddrs):
+        sym = uniqSyms.get(int(addr))
+        if sym: uniqNames[i] = sym.name
+        elif addr > 0x7f0000000000: uniqNames[i] = "stack/mmap"
+        else: uniqNames[i] = "heap"
+    names = uniqNames[inverse]
+
+    # Weight entries: one fault for R/W, one per invalidate message for I
+    amounts = df.invalidates.values
 
     objAccessed = { "stack/mmap" : [0, 0, 0], "heap" : [0, 0, 0] }
-    parsePAT(pat, config, problemSymbolCallback, objAccessed, verbose)
+    grouped = pd.Series(amounts).groupby([ names, df.perm.values ]).sum()
+    for (name, perm), amount in grouped.items():
+        if name not in objAccessed: objAccessed[name] = [0, 0, 0]
+        objAccessed[name][perm] += int(amount)
 
     # Generate list sorted by number of times accessed
     tuples = [ (tup[0], sum(tup[1]), tup[1]) for tup in objAccessed.items() ]
@@ -286,33 +427,31 @@ def parsePATforFaultLocs(pat, config, verbose):
                                              many times a page fault occurred
                                              at that location
     '''
-    def faultLocCallback(fields, timestamp, addr, symbol, locData):
-        if fields[3] == "R":
-            idx = 0
-            amount = 1
-        elif fields[3] == "W":
-            idx = 1
-            amount = 1
-        else:
-            idx = 2
-            amount = getNumInvalidateMessages(int(fields[6]))
-
-        dwarfInfo = locData[1]
-        filename, linenum = dwarfInfo.getFileAndLine(int(fields[4], base=16))
-        if filename:
-            locs = locData[0]
-            if filename not in locs: locs[filename] = { linenum : [0, 0, 0] }
-            elif linenum not in locs[filename]:
-                locs[filename][linenum] = [0, 0, 0]
-            locs[filename][linenum][idx] += amount
-        else: locData[0]["unknown"][idx] += amount
-
     def stringifyLoc(filename, linenum):
         return "{}:{}".format(filename, linenum)
 
-    locs = { "unknown" : [0, 0, 0] }
-    callbackData = (locs, config.dwarfInfo)
-    parsePAT(pat, config, faultLocCallback, callbackData, verbose)
+    df = _load_pat_df(pat, config, verbose)
+
+    # Resolve file & line for the unique fault sites only -- traces have many
+    # orders of magnitude more faults than distinct IPs, so the expensive
+    # DWARF lookups run O(unique IPs) times instead of once per fault
+    ips = np.array([ int(ip, base=16) for ip in df.ip.values ],
+                   dtype=np.uint64)
+    uniqIPs, inverse = np.unique(ips, return_inverse=True)
+    getFileAndLine = config.dwarfInfo.getFileAndLine
+    uniqLocs = np.empty(len(uniqIPs), dtype=object)
+    for i in range(len(uniqIPs)): uniqLocs[i] = getFileAndLine(int(uniqIPs[i]))
+
+    # Nested defaultdicts turn the existence-check-then-update pattern into a
+    # single probe per level
+    locs = defaultdict(lambda: defaultdict(lambda: [0, 0, 0]))
+    locs["unknown"] = [0, 0, 0]
+    grouped = pd.Series(df.invalidates.values) \
+                .groupby([ inverse, df.perm.values ]).sum()
+    for (ip, perm), amount in grouped.items():
+        filename, linenum = uniqLocs[ip]
+        if filename: locs[filename][linenum][perm] += int(amount)
+        else: locs["unknown"][perm] += int(amount)
 
     # Generate list sorted by number of times accessed
     allLocs = []
@@ -352,9 +491,15 @@ def parsePATforFalseSharing(pat, config, verbose):
             self.page = page
             self.faults = 0
             self.falseFaults = 0
-            self.seen = set([0])
-            self.hasCopy = set([0])
-            self.lastWrite = None
+            # Node membership as bitmasks (bit nid set if the node is a
+            # member) -- NIDs are small, and testing/setting a bit avoids the
+            # hashing & allocation of a Python set on every fault.  Node 0
+            # starts with a copy of the page.
+            self.seen = 1
+            self.hasCopy = 1
+            # Symbols are interned integer IDs (-1 = no write seen yet), so
+            # the state machine compares & hashes ints rather than names
+            self.lastWrite = -1
             self.problemSymbols = set()
 
         def track(self, symbol, nid, perm):
@@ -364,61 +509,82 @@ def parsePATforFalseSharing(pat, config, verbose):
             # The first page access is not considered false sharing, as the
             # first fault happens regardless of any consistency protocol (we
             # have to transport the data over at least once!)
-            if nid not in self.seen:
-                self.seen.add(nid)
+            bit = 1 << nid
+            if not (self.seen & bit):
+                self.seen |= bit
                 return
 
-            if perm == "W":
+            if perm == PermW:
                 # Either we're upgrading an existing page's permissions from
                 # "R", or we're in an invalid state due to a previous write.
                 # If the latter, check if the write was to the same symbol.
-                if nid not in self.hasCopy and \
-                        self.lastWrite and symbol != self.lastWrite:
+                if not (self.hasCopy & bit) and \
+                        self.lastWrite != -1 and symbol != self.lastWrite:
                     self.problemSymbols.add(symbol)
                     self.problemSymbols.add(self.lastWrite)
                     self.falseFaults += 1
-                self.hasCopy = set([nid])
+                self.hasCopy = bit
                 self.lastWrite = symbol
-            else: # perm == "R"
+            else: # perm == PermR
                 # We're in the invalid state due to a previous write (we never
                 # need to "downgrade" permissions).  Check if was to the same
                 # symbol.
-                if self.lastWrite and symbol != self.lastWrite:
+                if self.lastWrite != -1 and symbol != self.lastWrite:
                     self.problemSymbols.add(symbol)
                     self.problemSymbols.add(self.lastWrite)
                     self.falseFaults += 1
-                self.hasCopy.add(nid)
+                self.hasCopy |= bit
 
-    def falseSharingCallback(fields, timestamp, addr, symbol, pagesAccessed):
-        # Note: we can only track symbol table values, as we don't know the
-        # semantics of the stack/heap/mapped memory
-        if symbol:
-            page = getPage(addr)
-            if page not in pagesAccessed: pagesAccessed[page] = PageTracker(page)
-            pagesAccessed[page].track(symbol.name, int(fields[1]), fields[3])
+    df = _load_pat_df(pat, config, verbose)
 
-    pagesAccessed = {}
-    parsePAT(pat, config, falseSharingCallback, pagesAccessed, verbose)
+    # Note: we can only track symbol table values, as we don't know the
+    # semantics of the stack/heap/mapped memory
+    if "symbol" not in df.columns: return []
+    df = df[df.symbol.notna()]
 
-    return sorted(pagesAccessed.values(),
-                  reverse=True,
-                  key=lambda p: p.falseFaults)
+    # Intern symbol names to small integer IDs so the per-fault loop never
+    # hashes or compares strings
+    symIds, symNames = \
+        pd.factorize(np.array([ s.name for s in df.symbol.values ],
+                              dtype=object))
+
+    # Drive the per-page state machines directly from the preparsed columns;
+    # the loop touches nothing but the four arrays it consumes
+    pagesAccessed = {}
+    for page, nid, perm, symbol in zip(df.page.values.tolist(),
+                                       df.nid.values.tolist(),
+                                       df.perm.values.tolist(),
+                                       symIds.tolist()):
+        tracker = pagesAccessed.get(page)
+        if tracker is None: tracker = pagesAccessed[page] = PageTracker(page)
+        tracker.track(symbol, nid, perm)
+
+    # Translate the interned IDs back to names once for reporting
+    trackers = sorted(pagesAccessed.values(),
+                      reverse=True,
+                      key=lambda p: p.falseFaults)
+    for tracker in trackers:
+        tracker.problemSymbols = \
+            set([ symNames[i] for i in tracker.problemSymbols ])
+    return trackers
 
 def parsePATforPageFaultAtLoc(pat, config, loc, verbose):
     def pagesAtLocCallback(fields, timestamp, addr, symbol, pageData):
-        dwarfInfo = pageData[0]
-        filename, linenum = dwarfInfo.getFileAndLine(int(fields[4], base=16))
+        filename, linenum = pageData[0](int(fields[4], base=16))
         if filename == pageData[2] and linenum == pageData[3]:
-            if addr not in pageData[1]: pageData[1][addr] = 1
-            else: pageData[1][addr] += 1
+            pageData[1][addr] += 1
             pageData[4] += 1
 
     assert config.dwarfInfo, "No DWARF information for binary!"
     locSplit = loc.strip().split(":")
     assert len(locSplit) == 2, \
         "Invalid location '{}', must be 'file:line'".format(loc)
-    pages = {}
-    callbackData = [config.dwarfInfo, pages, locSplit[0], int(locSplit[1]), 0]
+
+    # The same IP faults many times across the trace; memoize the DWARF
+    # lookup so each unique site is resolved once
+    resolve = functools.lru_cache(maxsize=None)(config.dwarfInfo.getFileAndLine)
+    pages = defaultdict(int)
+    callbackData = [resolve, pages, locSplit[0], int(locSplit[1]), 0]
     parsePAT(pat, config, pagesAtLocCallback, callbackData, verbose)
 
     return sorted(pages.items(),